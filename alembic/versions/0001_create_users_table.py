@@ -0,0 +1,53 @@
+"""create users table
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-15 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases set up before migrations existed got this table from create_all;
+    # adopt it as-is so upgrading needs no manual stamp
+    if not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table('users'):
+        return
+
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('college', sa.String(), nullable=False),
+        sa.Column('branch', sa.String(), nullable=False),
+        sa.Column('year', sa.String(), nullable=False),
+        sa.Column('token', sa.String(length=6), nullable=False),
+        sa.Column('is_verified', sa.Boolean(), nullable=True),
+        sa.Column('token_created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_token', 'users', ['token'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_token', table_name='users')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_table('users')
@@ -0,0 +1,40 @@
+"""add partial index on unverified users
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-15 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Adopted databases may already have it from a newer create_all
+    if not context.is_offline_mode():
+        indexes = sa.inspect(op.get_bind()).get_indexes('users')
+        if any(index['name'] == 'ix_users_unverified' for index in indexes):
+            return
+
+    op.create_index(
+        'ix_users_unverified',
+        'users',
+        ['id'],
+        unique=False,
+        postgresql_where=sa.text('is_verified = false'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_unverified', table_name='users')
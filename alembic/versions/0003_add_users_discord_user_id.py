@@ -0,0 +1,34 @@
+"""add discord_user_id to users
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-15 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Adopted databases may already have it from a newer create_all
+    if not context.is_offline_mode():
+        columns = sa.inspect(op.get_bind()).get_columns('users')
+        if any(column['name'] == 'discord_user_id' for column in columns):
+            return
+
+    op.add_column('users', sa.Column('discord_user_id', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'discord_user_id')
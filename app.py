@@ -1,8 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
-import threading
 import os
+from contextlib import asynccontextmanager, suppress
 from dotenv import load_dotenv
 
 from src.models.database import engine
@@ -13,15 +13,30 @@ from src.discord_bot.bot import start_discord_bot
 # Load environment variables
 load_dotenv()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Schema is managed by Alembic (`alembic upgrade head`); opt in to create_all for local dev
+if os.getenv("AUTO_CREATE_TABLES", "false").lower() == "true":
+    Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="User Invitation System + Discord Bot", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the Discord bot on the server's event loop for the app's lifetime"""
+    bot_task = asyncio.create_task(start_discord_bot())
+    yield
+    bot_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await bot_task
 
-# Add CORS middleware
+app = FastAPI(title="User Invitation System + Discord Bot", version="1.0.0", lifespan=lifespan)
+
+# Add CORS middleware for the explicitly configured frontend origins
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "http://localhost:8501").split(",")
+    if origin.strip()
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -30,16 +45,6 @@ app.add_middleware(
 # Include routers
 app.include_router(users.router, prefix="/api")
 
-@app.on_event("startup")
-async def startup_event():
-    """Start Discord bot in background thread"""
-    def run_bot():
-        asyncio.run(start_discord_bot())
-    
-    # Start Discord bot in background thread
-    bot_thread = threading.Thread(target=run_bot, daemon=True)
-    bot_thread.start()
-
 @app.get("/")
 async def root():
     return {
@@ -70,9 +75,13 @@ if __name__ == "__main__":
     print("📚 API Documentation at: http://localhost:8000/api/docs")
     print("🤖 Discord bot will start automatically...")
     
+    # Single worker on purpose: the Discord bot runs inside this process and
+    # must only log in once. uvloop/httptools ship with uvicorn[standard].
     uvicorn.run(
         app, 
         host="0.0.0.0", 
         port=8000,
+        loop="uvloop",
+        http="httptools",
         log_level="info"
     ) 
\ No newline at end of file
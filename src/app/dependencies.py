@@ -1,5 +1,6 @@
 from fastapi import HTTPException, Depends, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import hmac
 import os
 from dotenv import load_dotenv
 
@@ -11,6 +12,9 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 if not SECRET_KEY:
     raise ValueError("SECRET_KEY environment variable is required")
 
+# Encoded once so each request only pays for the constant-time comparison
+SECRET_KEY_BYTES = SECRET_KEY.encode()
+
 async def verify_api_key(x_api_key: str = Header(None)):
     """
     Verify the x-api-key header against SECRET_KEY
@@ -21,7 +25,7 @@ async def verify_api_key(x_api_key: str = Header(None)):
             detail="x-api-key header is required"
         )
     
-    if x_api_key != SECRET_KEY:
+    if not hmac.compare_digest(x_api_key.encode(), SECRET_KEY_BYTES):
         raise HTTPException(
             status_code=403, 
             detail="Invalid API key"
@@ -1,23 +1,103 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from pydantic import TypeAdapter
+from cachetools import TTLCache
 import pandas as pd
+import asyncio
+import csv
 import io
+import os
+import threading
 from typing import List
 from datetime import datetime, timezone
 
-from src.models.database import get_db
+from src.models.database import SessionLocal, get_db
 from src.models.user import User
 from src.models.schemas import (
     UserCreate, UserResponse, UserVerification, VerificationResponse,
     CSVUploadResponse, EmailSendResponse
 )
-from src.utils.helpers import generate_token, is_token_expired, send_verification_email
+from src.utils.helpers import (
+    SENDGRID_BATCH_SIZE, generate_token, generate_tokens, is_token_expired,
+    send_verification_email, send_verification_emails_bulk
+)
 from src.app.dependencies import api_key_dependency
 
 router = APIRouter(tags=["users"])
 
+# Serializes user lists to JSON bytes in pydantic-core, skipping the stdlib json pass
+USER_LIST_ADAPTER = TypeAdapter(List[UserResponse])
+
+# Rows parsed from an uploaded CSV per chunk; memory stays flat for large files
+CSV_CHUNK_SIZE = 5000
+
+# Rows per executemany INSERT issued by CSV upload
+INSERT_BATCH_SIZE = 5000
+
+# Values per IN (...) lookup, keeping large uploads under driver parameter limits
+IN_QUERY_BATCH_SIZE = 1000
+
+# Rows fetched from the database per chunk of a streamed CSV export
+EXPORT_BATCH_SIZE = 1000
+
+# Attempts at drawing a token that does not collide with an existing one
+TOKEN_GENERATION_ATTEMPTS = 3
+
+# Maximum number of SendGrid requests in flight at once
+EMAIL_SEND_CONCURRENCY = int(os.getenv("EMAIL_SEND_CONCURRENCY", "10"))
+
+# Recent verification results, so repeated submits of the same form skip the database
+_verify_cache = TTLCache(maxsize=1024, ttl=2)
+_verify_cache_lock = threading.Lock()
+
+def _cached_verification(key: tuple):
+    """Return the cached verification result for `key`, or None"""
+    with _verify_cache_lock:
+        return _verify_cache.get(key)
+
+def _cache_verification(key: tuple, result):
+    """Remember a verification result for `key` and return it"""
+    with _verify_cache_lock:
+        _verify_cache[key] = result
+    return result
+
+def _existing_values(db: Session, column, values: List[str]) -> set:
+    """Return the subset of `values` already stored in `column`, using chunked IN queries"""
+    existing = set()
+    for start in range(0, len(values), IN_QUERY_BATCH_SIZE):
+        existing.update(
+            value for (value,) in db.query(column).filter(
+                column.in_(values[start:start + IN_QUERY_BATCH_SIZE])
+            )
+        )
+    return existing
+
+def _generate_unique_tokens(db: Session, count: int) -> List[str]:
+    """Generate `count` tokens unused in the database, checking collisions in batches"""
+    tokens = generate_tokens(count)
+    pending = list(range(count))
+    
+    while pending:
+        taken = _existing_values(db, User.token, [tokens[i] for i in pending])
+        seen = set()
+        collisions = []
+        for i, token in enumerate(tokens):
+            if token in seen or token in taken:
+                collisions.append(i)
+            seen.add(token)
+        
+        for i, token in zip(collisions, generate_tokens(len(collisions))):
+            tokens[i] = token
+        pending = collisions
+    
+    return tokens
+
 @router.post("/upload-csv", response_model=CSVUploadResponse)
-async def upload_csv(
+def upload_csv(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     api_key: str = api_key_dependency
@@ -27,67 +107,62 @@ async def upload_csv(
         raise HTTPException(status_code=400, detail="File must be a CSV")
     
     try:
-        # Read CSV content
-        content = await file.read()
-        df = pd.read_csv(io.StringIO(content.decode('utf-8')))
+        # Stream the spooled upload file in chunks
+        reader = pd.read_csv(file.file, dtype=str, keep_default_na=False, chunksize=CSV_CHUNK_SIZE)
         
-        # Validate required columns
         required_columns = ['email', 'name', 'college', 'branch', 'year']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Missing required columns: {missing_columns}"
-            )
-        
-        newly_added = 0
+        total_processed = 0
         skipped = 0
         newly_added_users = []
         
-        for _, row in df.iterrows():
-            email = row['email'].strip().lower()
-            name = row['name'].strip()
-            college = row['college'].strip()
-            branch = row['branch'].strip()
-            year = str(row['year']).strip()  # Changed from int(row['year']) to str(row['year']).strip()
+        for df in reader:
+            # Validate required columns
+            missing_columns = [col for col in required_columns if col not in df.columns]
+            if missing_columns:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Missing required columns: {missing_columns}"
+                )
             
-            # Check if user already exists
-            existing_user = db.query(User).filter(User.email == email).first()
-            if existing_user:
-                skipped += 1
-                continue
+            # Normalize all columns with vectorized string ops
+            df = df[required_columns]
+            for col in required_columns:
+                df[col] = df[col].str.strip()
+            df['email'] = df['email'].str.lower()
             
-            # Generate token
-            token = generate_token()
+            # Blank cells are read as ''; rows missing any required value are skipped
+            complete = df[(df != '').all(axis=1)]
             
-            # Create new user
-            new_user = User(
-                email=email,
-                name=name,
-                college=college,
-                branch=branch,
-                year=year,
-                token=token,
-                is_verified=False
-            )
+            # Fetch every already-registered email up front instead of once per row;
+            # rows inserted from earlier chunks are visible in this transaction too
+            existing_emails = _existing_values(db, User.email, complete['email'].unique().tolist())
+            new_rows = complete[~complete['email'].isin(existing_emails)].drop_duplicates('email')
+            total_processed += len(df)
+            skipped += len(df) - len(new_rows)
             
-            db.add(new_user)
-            newly_added += 1
-        
-        db.commit()
-        
-        # Get newly added users for response
-        if newly_added > 0:
-            newly_added_users = db.query(User).filter(
-                User.email.in_([row['email'].strip().lower() for _, row in df.iterrows()])
-            ).all()
+            tokens = _generate_unique_tokens(db, len(new_rows))
+            
+            mappings = new_rows.assign(token=tokens, is_verified=False).to_dict('records')
+            
+            # INSERT ... RETURNING hands back the new rows without a follow-up query;
+            # each batch goes out as multi-row VALUES statements
+            for start in range(0, len(mappings), INSERT_BATCH_SIZE):
+                newly_added_users.extend(db.scalars(
+                    insert(User).returning(User),
+                    mappings[start:start + INSERT_BATCH_SIZE]
+                ))
         
-        return CSVUploadResponse(
-            total_processed=len(df),
-            newly_added=newly_added,
+        # Build the response before commit expires the returned instances
+        response = CSVUploadResponse(
+            total_processed=total_processed,
+            newly_added=len(newly_added_users),
             skipped=skipped,
-            newly_added_users=newly_added_users
+            newly_added_users=USER_LIST_ADAPTER.validate_python(newly_added_users, from_attributes=True)
         )
+        db.commit()
+        
+        # Already validated above, so serialize directly instead of through response_model
+        return Response(content=response.model_dump_json(), media_type="application/json")
         
     except Exception as e:
         db.rollback()
@@ -101,11 +176,16 @@ async def send_verification_emails(
 ):
     """Send verification emails to specific users"""
     try:
-        # Get only the specified users who are unverified
-        users = db.query(User).filter(
-            User.id.in_(user_ids),
-            User.is_verified == False
-        ).all()
+        # Get only the specified users who are unverified, loading just the
+        # columns the email needs rather than full ORM entities
+        def load_unverified_users():
+            return db.query(User.email, User.name, User.token).filter(
+                User.id.in_(user_ids),
+                User.is_verified == False
+            ).all()
+        
+        # The query blocks, so keep it off the event loop the bot shares
+        users = await run_in_threadpool(load_unverified_users)
         
         if not users:
             return EmailSendResponse(
@@ -114,14 +194,49 @@ async def send_verification_emails(
                 emails_sent=0
             )
         
-        emails_sent = 0
-        failed_emails = []
+        # One SendGrid request per batch of recipients, overlapped in the threadpool
+        # and bounded by a semaphore
+        batches = [
+            [(user.email, user.name, user.token) for user in users[start:start + SENDGRID_BATCH_SIZE]]
+            for start in range(0, len(users), SENDGRID_BATCH_SIZE)
+        ]
+        semaphore = asyncio.Semaphore(EMAIL_SEND_CONCURRENCY)
         
-        for user in users:
-            if send_verification_email(user.email, user.name, user.token):
-                emails_sent += 1
-            else:
-                failed_emails.append(user.email)
+        async def send_one(email: str, name: str, token: str) -> bool:
+            async with semaphore:
+                return await run_in_threadpool(send_verification_email, email, name, token)
+        
+        async def send_batch(batch) -> List[bool]:
+            async with semaphore:
+                status = await run_in_threadpool(send_verification_emails_bulk, batch)
+            if status == 202:
+                return [True] * len(batch)
+            if status != 400:
+                # Outage, bad API key or lost response: retrying per recipient would only
+                # multiply failing requests, or send duplicates if the batch went through
+                return [False] * len(batch)
+            # SendGrid rejects the whole request if any address is malformed, so fall
+            # back to one request per recipient to deliver the rest of the batch
+            results = await asyncio.gather(
+                *(send_one(email, name, token) for email, name, token in batch),
+                return_exceptions=True
+            )
+            return [sent is True for sent in results]
+        
+        # An unexpected error in one batch must not abort the others
+        results = await asyncio.gather(
+            *(send_batch(batch) for batch in batches),
+            return_exceptions=True
+        )
+        
+        sent_flags = [
+            flag
+            for batch, batch_result in zip(batches, results)
+            for flag in (batch_result if isinstance(batch_result, list) else [False] * len(batch))
+        ]
+        recipients = [recipient for batch in batches for recipient in batch]
+        emails_sent = sum(sent_flags)
+        failed_emails = [email for (email, _, _), sent in zip(recipients, sent_flags) if not sent]
         
         message = f"Successfully sent {emails_sent} verification emails"
         if failed_emails:
@@ -137,58 +252,135 @@ async def send_verification_emails(
         raise HTTPException(status_code=500, detail=f"Error sending emails: {str(e)}")
 
 @router.get("/users", response_model=List[UserResponse])
-async def get_users(
+def get_users(
     db: Session = Depends(get_db),
     api_key: str = api_key_dependency
 ):
     """Get all users"""
-    users = db.query(User).all()
-    return users
+    # Plain rows of the response columns; no ORM entities or identity map needed
+    users = db.execute(select(
+        User.id, User.email, User.name, User.college, User.branch, User.year,
+        User.token, User.is_verified, User.token_created_at, User.created_at, User.updated_at
+    )).all()
+    return Response(
+        content=USER_LIST_ADAPTER.dump_json(
+            USER_LIST_ADAPTER.validate_python(users, from_attributes=True)
+        ),
+        media_type="application/json"
+    )
+
+@router.get("/users/export")
+def export_users_csv(api_key: str = api_key_dependency):
+    """Stream all users as a CSV download"""
+    columns = [
+        User.id, User.email, User.name, User.college, User.branch, User.year,
+        User.token, User.is_verified, User.token_created_at, User.created_at
+    ]
+    
+    def generate_rows():
+        # The stream outlives the request's dependencies, so it owns its session
+        db = SessionLocal()
+        try:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            
+            def flush() -> str:
+                chunk = buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                return chunk
+            
+            writer.writerow([column.key for column in columns])
+            yield flush()
+            
+            result = db.execute(select(*columns).execution_options(yield_per=EXPORT_BATCH_SIZE))
+            for partition in result.partitions():
+                writer.writerows(partition)
+                yield flush()
+        finally:
+            db.close()
+    
+    return StreamingResponse(
+        generate_rows(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="users.csv"'}
+    )
 
 @router.post("/refresh-token/{user_id}")
-async def refresh_token(
+def refresh_token(
     user_id: int, 
     db: Session = Depends(get_db),
     api_key: str = api_key_dependency
 ):
     """Refresh token for a specific user"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Generate new token
-    new_token = generate_token()
-    user.token = new_token
-    user.token_created_at = datetime.now(timezone.utc)
-    user.updated_at = datetime.now(timezone.utc)
-    
-    db.commit()
+    # Single UPDATE ... RETURNING, relying on the unique index to catch the rare collision
+    now = datetime.now(timezone.utc)
+    for _ in range(TOKEN_GENERATION_ATTEMPTS):
+        new_token = generate_token()
+        try:
+            updated = db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(token=new_token, token_created_at=now, updated_at=now)
+                .returning(User.id)
+            ).first()
+        except IntegrityError:
+            db.rollback()
+            continue
+        if updated is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        db.commit()
+        break
+    else:
+        raise HTTPException(status_code=500, detail="Could not generate a unique token")
     
     return {
         "message": "Token refreshed successfully",
         "new_token": new_token
     }
 
+def _already_verified_discord(stored_discord_user_id, discord_user_id) -> dict:
+    """Response for an already-verified user: success only for the Discord account that verified it"""
+    # Same Discord account resubmitting, e.g. the bot retrying a request whose
+    # response was lost after the verification had already been committed
+    if stored_discord_user_id == str(discord_user_id):
+        return {
+            "success": True,
+            "message": "User verified successfully",
+            "discord_user_id": discord_user_id
+        }
+    return {
+        "success": False,
+        "message": "User is already verified"
+    }
+
 @router.post("/verify", response_model=VerificationResponse)
-async def verify_user(
+def verify_user(
     verification: UserVerification,
     db: Session = Depends(get_db),
     api_key: str = api_key_dependency
 ):
     """Verify user with email and token"""
-    user = db.query(User).filter(User.email == verification.email).first()
+    cache_key = ("verify", verification.email, verification.token)
+    cached = _cached_verification(cache_key)
+    if cached is not None:
+        return cached
+    
+    user = db.query(
+        User.id, User.token, User.token_created_at, User.is_verified
+    ).filter(User.email == verification.email).first()
     
     if not user:
-        return VerificationResponse(
+        return _cache_verification(cache_key, VerificationResponse(
             success=False,
             message="User not found with this email"
-        )
+        ))
     
     if user.token != verification.token:
-        return VerificationResponse(
+        return _cache_verification(cache_key, VerificationResponse(
             success=False,
             message="Invalid verification token"
-        )
+        ))
     
     if user.is_verified:
         return VerificationResponse(
@@ -203,18 +395,28 @@ async def verify_user(
             message="Verification token has expired"
         )
     
-    # Mark user as verified
-    user.is_verified = True
-    user.updated_at = datetime.now(timezone.utc)
+    # Mark user as verified with a single UPDATE; no row matched means a
+    # concurrent request verified this user first
+    result = db.execute(
+        update(User)
+        .where(User.id == user.id, ~User.is_verified)
+        .values(is_verified=True, updated_at=datetime.now(timezone.utc))
+    )
     db.commit()
     
-    return VerificationResponse(
+    if result.rowcount == 0:
+        return VerificationResponse(
+            success=False,
+            message="User is already verified"
+        )
+    
+    return _cache_verification(cache_key, VerificationResponse(
         success=True,
         message="User verified successfully"
-    )
+    ))
 
 @router.post("/verify-discord")
-async def verify_user_discord(
+def verify_user_discord(
     verification: dict,
     db: Session = Depends(get_db),
     api_key: str = api_key_dependency
@@ -227,25 +429,29 @@ async def verify_user_discord(
     if not all([email, token, discord_user_id]):
         raise HTTPException(status_code=400, detail="Missing required fields")
     
-    user = db.query(User).filter(User.email == email).first()
+    cache_key = ("verify-discord", email, token, discord_user_id)
+    cached = _cached_verification(cache_key)
+    if cached is not None:
+        return cached
+    
+    user = db.query(
+        User.id, User.token, User.token_created_at, User.is_verified, User.discord_user_id
+    ).filter(User.email == email).first()
     
     if not user:
-        return {
+        return _cache_verification(cache_key, {
             "success": False,
             "message": "User not found with this email"
-        }
+        })
     
     if user.token != token:
-        return {
+        return _cache_verification(cache_key, {
             "success": False,
             "message": "Invalid verification token"
-        }
+        })
     
     if user.is_verified:
-        return {
-            "success": False,
-            "message": "User is already verified"
-        }
+        return _already_verified_discord(user.discord_user_id, discord_user_id)
     
     # Check if token is expired
     if is_token_expired(user.token_created_at):
@@ -254,19 +460,31 @@ async def verify_user_discord(
             "message": "Verification token has expired"
         }
     
-    # Mark user as verified
-    user.is_verified = True
-    user.updated_at = datetime.now(timezone.utc)
+    # Mark user as verified with a single UPDATE; no row matched means a
+    # concurrent request verified this user first
+    result = db.execute(
+        update(User)
+        .where(User.id == user.id, ~User.is_verified)
+        .values(
+            is_verified=True,
+            discord_user_id=str(discord_user_id),
+            updated_at=datetime.now(timezone.utc)
+        )
+    )
     db.commit()
     
-    return {
+    if result.rowcount == 0:
+        stored_discord_user_id = db.query(User.discord_user_id).filter(User.id == user.id).scalar()
+        return _already_verified_discord(stored_discord_user_id, discord_user_id)
+    
+    return _cache_verification(cache_key, {
         "success": True,
         "message": "User verified successfully",
         "discord_user_id": discord_user_id
-    }
+    })
 
 @router.delete("/all")
-async def delete_all_users(
+def delete_all_users(
     db: Session = Depends(get_db),
     api_key: str = api_key_dependency
 ):
@@ -280,7 +498,7 @@ async def delete_all_users(
         raise HTTPException(status_code=500, detail=f"Error deleting users: {str(e)}")
 
 @router.delete("/{user_id}")
-async def delete_user(
+def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
     api_key: str = api_key_dependency
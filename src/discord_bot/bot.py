@@ -1,10 +1,18 @@
 import discord
 from discord.ext import commands, tasks
 import aiohttp
+from cachetools import TTLCache
 import json
 import os
 import asyncio
-from datetime import datetime, timedelta
+import atexit
+import heapq
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
 from discord import app_commands
 from dotenv import load_dotenv
 
@@ -20,16 +28,183 @@ UNVERIFIED_ROLE_NAME = os.getenv('UNVERIFIED_ROLE_NAME', 'unverified')
 VERIFICATION_CHANNEL_NAME = os.getenv('VERIFICATION_CHANNEL_NAME', 'verification')
 VERIFICATION_TIMEOUT = int(os.getenv('VERIFICATION_TIMEOUT', '300'))  # 5 minutes default
 
-# Bot setup
-intents = discord.Intents.default()
-intents.message_content = True
+# Verification API retries on timeouts, dropped connections and 5xx responses
+VERIFY_API_ATTEMPTS = 3
+VERIFY_API_BACKOFF = 0.2  # seconds before the first retry, doubled each time
+
+# Logging: records are queued here and written to stdout by a background thread,
+# so event handlers never block the event loop on console I/O
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+logger = logging.getLogger('discord_bot')
+logger.addHandler(logging.handlers.QueueHandler(log_queue))
+logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+logger.propagate = False
+log_listener.start()
+atexit.register(log_listener.stop)
+
+# Bot setup: only guild and member events are needed for joins, roles and slash commands.
+# Guilds are not chunked at startup; members who join later are cached by the join event
+# and anyone else is fetched on demand by resolve_member
+intents = discord.Intents.none()
+intents.guilds = True
 intents.members = True
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+bot = commands.Bot(
+    command_prefix='!',
+    intents=intents,
+    member_cache_flags=discord.MemberCacheFlags.from_intents(intents),
+    chunk_guilds_at_startup=False
+)
 
-# Store pending verifications {user_id: {'guild_id': int, 'join_time': datetime, 'message_id': int}}
+# Store pending verifications {user_id: {'guild_id': int, 'expires_at': float, 'message_id': int}}, expires_at on the monotonic clock
 pending_verifications = {}
 
+# Min-heap of (expires_at, user_id) on the monotonic clock, so cleanup only visits due entries
+expiry_heap: list[tuple[float, int]] = []
+
+# Recent definitive verification failures {(discord_user_id, email, token): result}, so a quick
+# resubmit of the same details is answered locally; transient and auth failures are never cached
+failed_verification_cache = TTLCache(maxsize=1024, ttl=30)
+
+# Non-200 API statuses that reject the submitted details themselves and are safe to cache
+CACHEABLE_FAILURE_STATUSES = frozenset({400, 404, 422})
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected mid-flight
+background_tasks: set[asyncio.Task] = set()
+
+def run_in_background(coro) -> asyncio.Task:
+    """Schedule a coroutine without awaiting it, keeping a reference until it finishes"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+# Shared HTTP session for API calls so keep-alive connections, DNS lookups and auth headers are reused across verifications
+http_session: aiohttp.ClientSession | None = None
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Return the shared API session, creating it on first use inside the bot's event loop"""
+    global http_session
+    if http_session is None or http_session.closed:
+        http_session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=30),
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=75),
+            headers={
+                'Content-Type': 'application/json',
+                'x-api-key': API_KEY
+            }
+        )
+    return http_session
+
+async def close_http_session():
+    """Close the shared API session"""
+    global http_session
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+    http_session = None
+
+# Role ids per guild and name {(guild_id, role_name): role_id or None}, kept fresh by the role events below
+role_cache: dict[tuple[int, str], int | None] = {}
+
+def get_role_by_name(guild: discord.Guild, name: str) -> discord.Role | None:
+    """Return a guild role via an id lookup instead of scanning guild.roles by name"""
+    key = (guild.id, name)
+    if key not in role_cache:
+        role = discord.utils.get(guild.roles, name=name)
+        role_cache[key] = role.id if role else None
+    role_id = role_cache[key]
+    return guild.get_role(role_id) if role_id else None
+
+def get_member_role(guild: discord.Guild) -> discord.Role | None:
+    """Return the guild's Member role"""
+    return get_role_by_name(guild, MEMBER_ROLE_NAME)
+
+def get_unverified_role(guild: discord.Guild) -> discord.Role | None:
+    """Return the guild's Unverified role"""
+    return get_role_by_name(guild, UNVERIFIED_ROLE_NAME)
+
+# Verification channel id per guild {guild_id: channel_id or None}, kept fresh by the channel events below
+verification_channel_cache: dict[int, int | None] = {}
+
+def get_verification_channel(guild: discord.Guild) -> discord.abc.GuildChannel | None:
+    """Return the guild's verification channel via an id lookup instead of scanning guild.channels by name"""
+    if guild.id not in verification_channel_cache:
+        channel = discord.utils.get(guild.channels, name=VERIFICATION_CHANNEL_NAME)
+        verification_channel_cache[guild.id] = channel.id if channel else None
+    channel_id = verification_channel_cache[guild.id]
+    return guild.get_channel(channel_id) if channel_id else None
+
+async def resolve_member(guild: discord.Guild, user_id: int) -> discord.Member | None:
+    """Return a member from the cache, fetching it from the API if it isn't cached"""
+    member = guild.get_member(user_id)
+    if member is None:
+        try:
+            member = await guild.fetch_member(user_id)
+        except discord.HTTPException:
+            return None
+    return member
+
+async def swap_verification_roles(member: discord.Member, member_role: discord.Role | None, unverified_role: discord.Role | None):
+    """Grant the Member role and drop the Unverified role with a single member edit"""
+    roles = [role for role in member.roles if role != unverified_role and not role.is_default()]
+    if member_role and member_role not in roles:
+        roles.append(member_role)
+    
+    try:
+        await member.edit(roles=roles, reason="Verification completed")
+    except discord.Forbidden:
+        raise
+    except discord.HTTPException as e:
+        # Fall back to one call per role if the full role list was rejected
+        logger.error("❌ Role edit failed for %s, retrying per role: %s", member, e)
+        if member_role:
+            await member.add_roles(member_role)
+        if unverified_role and unverified_role in member.roles:
+            await member.remove_roles(unverified_role)
+    
+    logger.info("✅ Gave %s the %s role (removed %s)", member, MEMBER_ROLE_NAME, UNVERIFIED_ROLE_NAME)
+
+async def delayed_kick(guild_id: int, user_id: int, reason: str, delay: float):
+    """Kick a member after `delay` seconds, resolving them again once the wait is over"""
+    await asyncio.sleep(delay)
+    
+    guild = bot.get_guild(guild_id)
+    member = await resolve_member(guild, user_id) if guild else None
+    
+    if member:
+        try:
+            await member.kick(reason=reason)
+            logger.info("👢 Kicked %s - %s", member, reason)
+        except discord.Forbidden:
+            logger.error("❌ No permission to kick %s", member)
+        except discord.NotFound:
+            logger.error("❌ User %s not found (may have left)", member)
+        except Exception as e:
+            logger.error("❌ Error kicking %s: %s", member, e)
+
+# Verification result embeds, built once; the failure one is rebuilt from its dict to add the reason
+verification_success_embed = discord.Embed(
+    title="✅ Verification Successful!",
+    description="Welcome! You now have full access to the server.",
+    color=0x00ff00
+)
+verification_success_embed.add_field(
+    name="🎉 You can now:",
+    value="• Access all server channels\n• Participate in discussions\n• Enjoy the community!",
+    inline=False
+)
+
+verification_failure_embed_dict = discord.Embed(
+    title="❌ Verification Failed",
+    description="Your email and token could not be verified.",
+    color=0xff0000
+).add_field(
+    name="⚠️ You will be removed:",
+    value="Contact the server administrator if you believe this is an error.",
+    inline=False
+).to_dict()
+
 class VerificationModal(discord.ui.Modal, title='🔐 Email & Token Verification'):
     def __init__(self, user_id: int, guild_id: int):
         super().__init__()
@@ -59,7 +234,7 @@ class VerificationModal(discord.ui.Modal, title='🔐 Email & Token Verification
             return
 
         await interaction.response.defer(ephemeral=True)
-        print(f"🔍 Verifying user {interaction.user} with email: {self.email.value}")
+        logger.info("🔍 Verifying user %s with email: %s", interaction.user, self.email.value)
         
         # Call the API endpoint
         verification_result = await verify_user(
@@ -68,54 +243,38 @@ class VerificationModal(discord.ui.Modal, title='🔐 Email & Token Verification
             str(self.user_id)
         )
         
-        print(f"🔍 API Response: {verification_result}")
+        logger.debug("🔍 API Response: %s", verification_result)
         
         if verification_result['success']:
-            # Verification successful
-            guild = bot.get_guild(self.guild_id)
-            member = guild.get_member(self.user_id) if guild else None
+            # Verification successful. Use the gateway-maintained member rather than
+            # interaction.user: that snapshot is from submit time, and the role edit below
+            # replaces the whole role list, so roles granted during the API call would be lost
+            guild = interaction.guild or bot.get_guild(self.guild_id)
+            member = await resolve_member(guild, self.user_id) if guild else None
             
             if member:
-                member_role = discord.utils.get(guild.roles, name=MEMBER_ROLE_NAME)
-                unverified_role = discord.utils.get(guild.roles, name=UNVERIFIED_ROLE_NAME)
+                member_role = get_member_role(guild)
+                unverified_role = get_unverified_role(guild)
                 
                 try:
                     # Add Member role and remove Unverified role
-                    if member_role:
-                        await member.add_roles(member_role)
-                        print(f"✅ Added {MEMBER_ROLE_NAME} role to {member}")
-                    
-                    if unverified_role and unverified_role in member.roles:
-                        await member.remove_roles(unverified_role)
-                        print(f"🗑️ Removed {UNVERIFIED_ROLE_NAME} role from {member}")
+                    await swap_verification_roles(member, member_role, unverified_role)
                     
                     # Remove from pending verifications
-                    if self.user_id in pending_verifications:
-                        del pending_verifications[self.user_id]
+                    pending_verifications.pop(self.user_id, None)
                     
                     # Send success message
-                    embed = discord.Embed(
-                        title="✅ Verification Successful!",
-                        description="Welcome! You now have full access to the server.",
-                        color=0x00ff00
-                    )
-                    embed.add_field(
-                        name="🎉 You can now:",
-                        value="• Access all server channels\n• Participate in discussions\n• Enjoy the community!",
-                        inline=False
-                    )
-                    
-                    await interaction.followup.send(embed=embed, ephemeral=True)
-                    print(f"✅ User {member} verified successfully")
+                    await interaction.followup.send(embed=verification_success_embed, ephemeral=True)
+                    logger.info("✅ User %s verified successfully", member)
                     
                 except discord.Forbidden:
                     await interaction.followup.send(
                         "❌ Bot permission error. Please contact an administrator.",
                         ephemeral=True
                     )
-                    print(f"❌ No permission to manage roles for {member}")
+                    logger.error("❌ No permission to manage roles for %s", member)
                 except Exception as e:
-                    print(f"❌ Error managing roles: {e}")
+                    logger.error("❌ Error managing roles: %s", e)
                     await interaction.followup.send(
                         "❌ An error occurred. Please contact an administrator.",
                         ephemeral=True
@@ -127,46 +286,28 @@ class VerificationModal(discord.ui.Modal, title='🔐 Email & Token Verification
                 )
         else:
             # Verification failed - kick the user
-            print(f"❌ Verification failed for {interaction.user}: {verification_result['message']}")
+            logger.error("❌ Verification failed for %s: %s", interaction.user, verification_result['message'])
             
-            embed = discord.Embed(
-                title="❌ Verification Failed",
-                description="Your email and token could not be verified.",
-                color=0xff0000
-            )
-            embed.add_field(
-                name="🚫 Reason:",
-                value=verification_result['message'],
-                inline=False
-            )
-            embed.add_field(
-                name="⚠️ You will be removed:",
-                value="Contact the server administrator if you believe this is an error.",
-                inline=False
-            )
+            # Embed.copy() shares the fields list, so build a fresh one with the reason first
+            embed = discord.Embed.from_dict({
+                **verification_failure_embed_dict,
+                'fields': [
+                    {'name': "🚫 Reason:", 'value': str(verification_result['message']), 'inline': False},
+                    *verification_failure_embed_dict['fields']
+                ]
+            })
             
             await interaction.followup.send(embed=embed, ephemeral=True)
             
-            # Wait 3 seconds then kick
-            await asyncio.sleep(3)
-            
-            guild = bot.get_guild(self.guild_id)
-            member = guild.get_member(self.user_id) if guild else None
-            
-            if member:
-                try:
-                    await member.kick(reason=f"Email verification failed: {verification_result['message']}")
-                    print(f"👢 Kicked {member} - verification failed: {verification_result['message']}")
-                except discord.Forbidden:
-                    print(f"❌ No permission to kick {member}")
-                except discord.NotFound:
-                    print(f"❌ User {member} not found (may have left)")
-                except Exception as e:
-                    print(f"❌ Error kicking {member}: {e}")
-            
-            # Remove from pending
-            if self.user_id in pending_verifications:
-                del pending_verifications[self.user_id]
+            # Kick after a short delay so the user can read the message; the task
+            # only holds the ids, not this modal or the interaction
+            pending_verifications.pop(self.user_id, None)
+            run_in_background(delayed_kick(
+                self.guild_id,
+                self.user_id,
+                f"Email verification failed: {verification_result['message']}",
+                delay=3
+            ))
 
 class VerificationView(discord.ui.View):
     def __init__(self, user_id: int, guild_id: int):
@@ -191,57 +332,56 @@ class VerificationView(discord.ui.View):
         # Open the modal (popup)
         modal = VerificationModal(self.user_id, self.guild_id)
         await interaction.response.send_modal(modal)
-        print(f"📝 Opened verification modal for {interaction.user}")
+        logger.info("📝 Opened verification modal for %s", interaction.user)
 
-    async def on_timeout(self):
-        # User didn't verify in time - kick them
-        print(f"⏰ Verification timeout for user {self.user_id}")
-        
-        if self.user_id in pending_verifications:
-            guild = bot.get_guild(self.guild_id)
-            member = guild.get_member(self.user_id) if guild else None
-            
-            if member:
-                try:
-                    await member.kick(reason="Verification timeout - did not complete verification")
-                    print(f"👢 Kicked {member} - verification timeout")
-                except discord.Forbidden:
-                    print(f"❌ No permission to kick {member}")
-                except discord.NotFound:
-                    print(f"❌ User {member} not found (may have left)")
-                except Exception as e:
-                    print(f"❌ Error kicking {member}: {e}")
-            
-            del pending_verifications[self.user_id]
+class RetryableAPIError(Exception):
+    """API response that is worth retrying (server-side 5xx)"""
 
-async def verify_user(email: str, verification_code: str, discord_user_id: str) -> dict:
-    """Send verification request to the API endpoint"""
-    headers = {
-        'Content-Type': 'application/json',
-        'x-api-key': API_KEY
-    }
-    
+async def backoff_before_retry(attempt: int, reason):
+    """Sleep with exponential backoff and jitter before the next API attempt"""
+    delay = VERIFY_API_BACKOFF * 2 ** (attempt - 1) + random.random() * 0.1
+    logger.warning("⚠️ API attempt %s/%s failed (%s), retrying in %.2fs", attempt, VERIFY_API_ATTEMPTS, reason, delay)
+    await asyncio.sleep(delay)
+
+async def verify_user(email: str, verification_code: str, discord_user_id: str, use_cache: bool = True) -> dict:
+    """Send verification request to the API endpoint, retrying transient failures"""
     payload = {
         'email': email,
         'token': verification_code,  # Changed to match backend API
         'discord_user_id': discord_user_id
     }
     
-    print(f"🌐 Calling API: {API_ENDPOINT}")
-    print(f"📤 Payload: {payload}")
+    cache_key = (discord_user_id, email, verification_code)
+    cached = failed_verification_cache.get(cache_key) if use_cache else None
+    if cached is not None:
+        logger.info("♻️ Reusing recent failed verification for %s", discord_user_id)
+        return cached
     
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(API_ENDPOINT, json=payload, headers=headers, timeout=30) as response:
-                response_text = await response.text()
-                print(f"📥 API Response Status: {response.status}")
-                print(f"📥 API Response Body: {response_text}")
+    logger.info("🌐 Calling API: %s", API_ENDPOINT)
+    # Payload and body carry the user's email and token, so they are only traced at DEBUG
+    logger.debug("📤 Payload: %s", payload)
+    
+    for attempt in range(1, VERIFY_API_ATTEMPTS + 1):
+        try:
+            session = get_http_session()
+            async with session.post(API_ENDPOINT, json=payload) as response:
+                body = await response.read()
+                logger.info("📥 API Response Status: %s", response.status)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("📥 API Response Body: %s", body.decode('utf-8', 'replace'))
+                
+                if response.status >= 500 and attempt < VERIFY_API_ATTEMPTS:
+                    raise RetryableAPIError(f"status {response.status}")
+                
+                # Parse the body once and share it between the success and error branches
+                try:
+                    result = json.loads(body)
+                except ValueError:
+                    result = None
                 
                 if response.status == 200:
-                    try:
-                        result = await response.json()
-                    except:
-                        result = {"success": False, "message": "Invalid API response format"}
+                    if result is None:
+                        return {"success": False, "message": "Invalid API response format"}
                     
                     # Check various success indicators
                     if result.get('success') or result.get('verified') or result.get('valid'):
@@ -249,107 +389,167 @@ async def verify_user(email: str, verification_code: str, discord_user_id: str)
                             'success': True,
                             'message': result.get('message', 'Verification successful')
                         }
-                    else:
-                        return {
-                            'success': False,
-                            'message': result.get('message', 'Invalid verification code or email')
-                        }
+                    
+                    failure = {
+                        'success': False,
+                        'message': result.get('message', 'Invalid verification code or email')
+                    }
+                    if use_cache:
+                        failed_verification_cache[cache_key] = failure
+                    return failure
                 
                 else:
-                    try:
-                        error_data = await response.json()
-                        error_message = error_data.get('message', f'Server error (Status: {response.status})')
-                    except:
-                        error_message = f'Server error (Status: {response.status})'
+                    error_message = f'Server error (Status: {response.status})'
+                    if result is not None:
+                        error_message = result.get('message', error_message)
                     
-                    return {
+                    failure = {
                         'success': False,
                         'message': error_message
                     }
+                    # Only answers about the submitted details are definitive; auth errors,
+                    # rate limits and 5xx responses can clear up on the next submit
+                    if use_cache and response.status in CACHEABLE_FAILURE_STATUSES:
+                        failed_verification_cache[cache_key] = failure
+                    return failure
                     
-    except aiohttp.ClientTimeout:
-        print("❌ API request timeout")
-        return {
-            'success': False,
-            'message': 'Request timeout'
-        }
-    except Exception as e:
-        print(f"❌ API request error: {e}")
-        return {
-            'success': False,
-            'message': f'Network error: {str(e)}'
-        }
+        except asyncio.TimeoutError:
+            if attempt < VERIFY_API_ATTEMPTS:
+                await backoff_before_retry(attempt, "timeout")
+                continue
+            logger.error("❌ API request timeout after %s attempts", attempt)
+            return {
+                'success': False,
+                'message': 'Request timeout'
+            }
+        except (aiohttp.ClientConnectionError, RetryableAPIError) as e:
+            if attempt < VERIFY_API_ATTEMPTS:
+                await backoff_before_retry(attempt, e)
+                continue
+            logger.error("❌ API request error after %s attempts: %s", attempt, e)
+            return {
+                'success': False,
+                'message': f'Network error: {str(e)}'
+            }
+        except Exception as e:
+            logger.error("❌ API request error: %s", e)
+            return {
+                'success': False,
+                'message': f'Network error: {str(e)}'
+            }
 
 @bot.event
 async def on_ready():
-    print(f'🤖 {bot.user} has logged in!')
-    print(f'📡 Connected to {len(bot.guilds)} guild(s)')
-    print(f'⏰ Verification timeout: {VERIFICATION_TIMEOUT} seconds')
-    print(f'🔑 API Endpoint: {API_ENDPOINT}')
+    logger.info('🤖 %s has logged in!', bot.user)
+    logger.info('📡 Connected to %s guild(s)', len(bot.guilds))
+    logger.info('⏰ Verification timeout: %s seconds', VERIFICATION_TIMEOUT)
+    logger.info('🔑 API Endpoint: %s', API_ENDPOINT)
+    
+    # Resolve verification roles and channels once up front
+    for guild in bot.guilds:
+        get_member_role(guild)
+        get_unverified_role(guild)
+        get_verification_channel(guild)
     
     # Start cleanup task
     cleanup_expired_verifications.start()
     
     try:
         synced = await bot.tree.sync()
-        print(f"✅ Synced {len(synced)} slash command(s)")
+        logger.info("✅ Synced %s slash command(s)", len(synced))
     except Exception as e:
-        print(f"❌ Failed to sync commands: {e}")
+        logger.error("❌ Failed to sync commands: %s", e)
+
+@bot.event
+async def on_guild_role_create(role):
+    role_cache.pop((role.guild.id, role.name), None)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    role_cache.pop((after.guild.id, before.name), None)
+    role_cache.pop((after.guild.id, after.name), None)
+
+@bot.event
+async def on_guild_role_delete(role):
+    role_cache.pop((role.guild.id, role.name), None)
+
+@bot.event
+async def on_guild_channel_create(channel):
+    if channel.name == VERIFICATION_CHANNEL_NAME:
+        verification_channel_cache.pop(channel.guild.id, None)
+
+@bot.event
+async def on_guild_channel_update(before, after):
+    if VERIFICATION_CHANNEL_NAME in (before.name, after.name):
+        verification_channel_cache.pop(after.guild.id, None)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    if verification_channel_cache.get(channel.guild.id) == channel.id:
+        verification_channel_cache.pop(channel.guild.id, None)
+
+# Static part of the verification popup (like terms & conditions), copied for each join
+verification_embed_template = discord.Embed(
+    title="🔐 Email Verification Required",
+    description=f"To access this server, you must verify your email and token within **{VERIFICATION_TIMEOUT // 60} minutes**.",
+    color=0x0099ff
+)
+verification_embed_template.add_field(
+    name="📋 What you need:",
+    value="• Your registered **email address**\n• Your **verification token/code**",
+    inline=False
+)
+verification_embed_template.add_field(
+    name="⚠️ Important:",
+    value="• Click the button below to start verification\n• You will be **removed** if you don't verify\n• Contact administrator if you need help",
+    inline=False
+)
+verification_embed_template.set_footer(text=f"⏰ Time limit: {VERIFICATION_TIMEOUT // 60} minutes • You must verify to stay")
 
 @bot.event
 async def on_member_join(member):
     """Show verification popup immediately when someone joins"""
-    print(f"👤 New member joined: {member} ({member.id}) in {member.guild.name}")
+    logger.info("👤 New member joined: %s (%s) in %s", member, member.id, member.guild.name)
     
-    # Check if user already has Member role
-    member_role = discord.utils.get(member.guild.roles, name=MEMBER_ROLE_NAME)
-    if member_role and member_role in member.roles:
-        print(f"✅ User {member} already has {MEMBER_ROLE_NAME} role")
+    # Find verification channel first; without it there is no flow to put the member through
+    verification_channel = get_verification_channel(member.guild)
+    if not verification_channel:
+        logger.error("❌ Verification channel '%s' not found", VERIFICATION_CHANNEL_NAME)
         return
     
-    # Add Unverified role if it exists
-    unverified_role = discord.utils.get(member.guild.roles, name=UNVERIFIED_ROLE_NAME)
-    if unverified_role:
-        try:
-            await member.add_roles(unverified_role)
-            print(f"🏷️ Added {UNVERIFIED_ROLE_NAME} role to {member}")
-        except discord.Forbidden:
-            print(f"❌ No permission to add {UNVERIFIED_ROLE_NAME} role to {member}")
-    
-    # Find verification channel
-    verification_channel = discord.utils.get(member.guild.channels, name=VERIFICATION_CHANNEL_NAME)
-    if not verification_channel:
-        print(f"❌ Verification channel '{VERIFICATION_CHANNEL_NAME}' not found")
+    # Check if user already has Member role
+    member_role = get_member_role(member.guild)
+    if member_role and member_role in member.roles:
+        logger.info("✅ User %s already has %s role", member, MEMBER_ROLE_NAME)
         return
     
     # Add to pending verifications
+    expires_at = time.monotonic() + VERIFICATION_TIMEOUT
     pending_verifications[member.id] = {
         'guild_id': member.guild.id,
-        'join_time': datetime.now()
+        'expires_at': expires_at
     }
+    heapq.heappush(expiry_heap, (expires_at, member.id))
     
-    # Create verification embed (like terms & conditions popup)
-    embed = discord.Embed(
-        title="🔐 Email Verification Required",
-        description=f"**Welcome to {member.guild.name}!**\n\nTo access this server, you must verify your email and token within **{VERIFICATION_TIMEOUT // 60} minutes**.",
-        color=0x0099ff
-    )
-    
-    embed.add_field(
-        name="📋 What you need:",
-        value="• Your registered **email address**\n• Your **verification token/code**",
-        inline=False
-    )
-    
-    embed.add_field(
-        name="⚠️ Important:",
-        value="• Click the button below to start verification\n• You will be **removed** if you don't verify\n• Contact administrator if you need help",
-        inline=False
-    )
-    
-    embed.set_footer(text=f"⏰ Time limit: {VERIFICATION_TIMEOUT // 60} minutes • You must verify to stay")
+    # Only the guild name and avatar differ per member; the rest comes from the template
+    embed = verification_embed_template.copy()
+    embed.description = f"**Welcome to {member.guild.name}!**\n\n{embed.description}"
     embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
     
+    # Post in the background so a burst of joins isn't serialized behind Discord API calls
+    run_in_background(send_verification_prompt(member, verification_channel, embed))
+    
+    # Add Unverified role if it exists
+    unverified_role = get_unverified_role(member.guild)
+    if unverified_role:
+        try:
+            await member.add_roles(unverified_role)
+            logger.info("🏷️ Added %s role to %s", UNVERIFIED_ROLE_NAME, member)
+        except discord.Forbidden:
+            logger.error("❌ No permission to add %s role to %s", UNVERIFIED_ROLE_NAME, member)
+
+async def send_verification_prompt(member, verification_channel, embed):
+    """Post the verification popup for a new member and remember its message id"""
     # Create verification view with popup button
     view = VerificationView(member.id, member.guild.id)
     
@@ -361,44 +561,47 @@ async def on_member_join(member):
             view=view
         )
         
-        # Store message ID for cleanup
-        pending_verifications[member.id]['message_id'] = message.id
+        # Store message ID for cleanup, unless the user already left the pending list
+        pending = pending_verifications.get(member.id)
+        if pending is not None:
+            pending['message_id'] = message.id
         
-        print(f"📨 Posted verification popup for {member} in #{verification_channel.name}")
+        logger.info("📨 Posted verification popup for %s in #%s", member, verification_channel.name)
         
     except discord.Forbidden:
-        print(f"❌ No permission to send message in #{verification_channel.name}")
+        logger.error("❌ No permission to send message in #%s", verification_channel.name)
     except Exception as e:
-        print(f"❌ Error sending verification message: {e}")
+        logger.error("❌ Error sending verification message: %s", e)
 
-@tasks.loop(minutes=1)
+@tasks.loop(seconds=5)
 async def cleanup_expired_verifications():
     """Remove users who haven't verified within the time limit"""
-    current_time = datetime.now()
-    expired_users = []
-    
-    for user_id, data in pending_verifications.items():
-        if current_time - data['join_time'] > timedelta(seconds=VERIFICATION_TIMEOUT):
-            expired_users.append(user_id)
+    current_time = time.monotonic()
     
-    for user_id in expired_users:
-        guild_id = pending_verifications[user_id]['guild_id']
-        guild = bot.get_guild(guild_id)
+    # Only entries that are actually due get popped; the rest of the heap is untouched
+    while expiry_heap and expiry_heap[0][0] <= current_time:
+        expires_at, user_id = heapq.heappop(expiry_heap)
+        data = pending_verifications.get(user_id)
+        
+        # Stale heap entry: user already verified, was removed, or rejoined since
+        if data is None or data['expires_at'] != expires_at:
+            continue
+        
+        del pending_verifications[user_id]
+        guild = bot.get_guild(data['guild_id'])
         
         if guild:
-            member = guild.get_member(user_id)
+            member = await resolve_member(guild, user_id)
             if member:
                 try:
                     await member.kick(reason="Verification timeout - did not complete verification within time limit")
-                    print(f"👢 Kicked {member} - verification timeout (cleanup)")
+                    logger.info("👢 Kicked %s - verification timeout (cleanup)", member)
                 except discord.Forbidden:
-                    print(f"❌ No permission to kick {member}")
+                    logger.error("❌ No permission to kick %s", member)
                 except discord.NotFound:
-                    print(f"❌ User {member} not found")
+                    logger.error("❌ User %s not found", member)
                 except Exception as e:
-                    print(f"❌ Error kicking {member}: {e}")
-        
-        del pending_verifications[user_id]
+                    logger.error("❌ Error kicking %s: %s", member, e)
 
 # Admin commands
 @bot.tree.command(name="setup_roles", description="Create required verification roles (Admin only)")
@@ -411,7 +614,7 @@ async def setup_roles(interaction: discord.Interaction):
     created_roles = []
     
     # Create Member role if doesn't exist
-    member_role = discord.utils.get(guild.roles, name=MEMBER_ROLE_NAME)
+    member_role = get_member_role(guild)
     if not member_role:
         try:
             member_role = await guild.create_role(
@@ -425,7 +628,7 @@ async def setup_roles(interaction: discord.Interaction):
             return
     
     # Create Unverified role if doesn't exist
-    unverified_role = discord.utils.get(guild.roles, name=UNVERIFIED_ROLE_NAME)
+    unverified_role = get_unverified_role(guild)
     if not unverified_role:
         try:
             unverified_role = await guild.create_role(
@@ -461,11 +664,11 @@ async def verification_status(interaction: discord.Interaction):
     
     embed = discord.Embed(title="📋 Pending Verifications", color=0xff9900)
     
+    now = time.monotonic()
     for user_id, data in pending_verifications.items():
         member = interaction.guild.get_member(user_id)
         if member:
-            time_elapsed = (datetime.now() - data['join_time']).seconds
-            time_left = max(0, VERIFICATION_TIMEOUT - time_elapsed)
+            time_left = max(0, int(data['expires_at'] - now))
             embed.add_field(
                 name=f"{member.display_name}",
                 value=f"⏰ {time_left // 60}m {time_left % 60}s left",
@@ -480,23 +683,20 @@ async def force_verify(interaction: discord.Interaction, member: discord.Member)
         await interaction.response.send_message("❌ Admin only command.", ephemeral=True)
         return
     
-    member_role = discord.utils.get(interaction.guild.roles, name=MEMBER_ROLE_NAME)
-    unverified_role = discord.utils.get(interaction.guild.roles, name=UNVERIFIED_ROLE_NAME)
+    member_role = get_member_role(interaction.guild)
+    unverified_role = get_unverified_role(interaction.guild)
     
     if not member_role:
         await interaction.response.send_message(f"❌ '{MEMBER_ROLE_NAME}' role not found.", ephemeral=True)
         return
     
     try:
-        await member.add_roles(member_role)
-        if unverified_role and unverified_role in member.roles:
-            await member.remove_roles(unverified_role)
+        await swap_verification_roles(member, member_role, unverified_role)
         
-        if member.id in pending_verifications:
-            del pending_verifications[member.id]
+        pending_verifications.pop(member.id, None)
         
         await interaction.response.send_message(f"✅ Manually verified {member.mention}", ephemeral=True)
-        print(f"👑 Admin {interaction.user} manually verified {member}")
+        logger.info("👑 Admin %s manually verified %s", interaction.user, member)
         
     except Exception as e:
         await interaction.response.send_message(f"❌ Error: {e}", ephemeral=True)
@@ -509,8 +709,8 @@ async def test_api(interaction: discord.Interaction):
     
     await interaction.response.defer(ephemeral=True)
     
-    # Test API with dummy data
-    result = await verify_user("test@example.com", "123456", "123456789")
+    # Test API with dummy data, always hitting the API rather than a cached failure
+    result = await verify_user("test@example.com", "123456", "123456789", use_cache=False)
     
     embed = discord.Embed(title="🧪 API Test Results", color=0x0099ff)
     embed.add_field(name="Endpoint", value=API_ENDPOINT, inline=False)
@@ -522,18 +722,23 @@ async def test_api(interaction: discord.Interaction):
 async def start_discord_bot():
     """Start the Discord bot"""
     if not DISCORD_TOKEN:
-        print("❌ DISCORD_TOKEN environment variable is required!")
+        logger.error("❌ DISCORD_TOKEN environment variable is required!")
         return
     
     if not API_KEY:
-        print("❌ SECRET_KEY environment variable is required!")
+        logger.error("❌ SECRET_KEY environment variable is required!")
         return
     
-    print("🚀 Starting Discord bot...")
+    logger.info("🚀 Starting Discord bot...")
     try:
         await bot.start(DISCORD_TOKEN)
     except Exception as e:
-        print(f"❌ Failed to start Discord bot: {e}")
+        logger.error("❌ Failed to start Discord bot: %s", e)
+    finally:
+        # Runs on cancellation too, so the gateway and HTTP sessions close cleanly
+        if not bot.is_closed():
+            await bot.close()
+        await close_http_session()
 
 # For standalone bot usage
 if __name__ == "__main__":
@@ -12,6 +12,8 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_NAME = os.getenv("DB_NAME", "postgres")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
 
 # Construct DATABASE_URL with Azure-specific parameters
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?sslmode=require"
@@ -19,9 +21,13 @@ DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NA
 # Create engine with Azure PostgreSQL optimizations
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before use
-    pool_recycle=300,    # Recycle connections every 5 minutes
-    echo=False           # Set to True for SQL debugging
+    pool_size=DB_POOL_SIZE,          # Persistent connections kept open across requests
+    max_overflow=DB_MAX_OVERFLOW,    # Extra connections allowed under burst load
+    pool_pre_ping=True,              # Verify connections before use
+    pool_recycle=300,                # Recycle connections every 5 minutes
+    query_cache_size=1200,           # Compiled statement cache shared by all sessions
+    insertmanyvalues_page_size=5000, # Rows per multi-row INSERT for bulk inserts
+    echo=False                       # Set to True for SQL debugging
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
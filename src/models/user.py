@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime
+from sqlalchemy import Column, String, Integer, Boolean, DateTime, Index, text
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -11,8 +11,14 @@ class User(Base):
     college = Column(String, nullable=False)
     branch = Column(String, nullable=False)
     year = Column(String, nullable=False)
-    token = Column(String(6), unique=True, nullable=False)
+    token = Column(String(6), unique=True, index=True, nullable=False)
     is_verified = Column(Boolean, default=False)
+    discord_user_id = Column(String, nullable=True)
     token_created_at = Column(DateTime(timezone=True), server_default=func.now())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now()) 
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now()) 
+
+    # Partial index covering only the unverified users that email sends target
+    __table_args__ = (
+        Index("ix_users_unverified", "id", postgresql_where=text("is_verified = false")),
+    )
@@ -1,63 +1,121 @@
-import random
+import secrets
 import string
 import os
-from typing import Optional
+from typing import List, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from sendgrid.helpers.mail import Mail, To
+from python_http_client.exceptions import HTTPError
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def generate_token(length: int = 6) -> str:
-    """Generate a random alphanumeric token of specified length"""
-    characters = string.ascii_uppercase + string.digits
-    return ''.join(random.choice(characters) for _ in range(length))
+TOKEN_EXPIRY_DAYS = int(os.getenv("TOKEN_EXPIRY_DAYS", 7))
+TOKEN_EXPIRY = timedelta(days=TOKEN_EXPIRY_DAYS)
+SENDGRID_FROM_EMAIL = os.getenv("SENDGRID_FROM_EMAIL")
 
-def is_token_expired(token_created_at: datetime, expiry_days: Optional[int] = None) -> bool:
-    """Check if a token has expired based on creation date"""
-    if expiry_days is None:
-        expiry_days = int(os.getenv("TOKEN_EXPIRY_DAYS", 7))
-    
-    expiry_date = token_created_at + timedelta(days=expiry_days)
-    return datetime.now(timezone.utc) > expiry_date
+# Recipients per bulk SendGrid request; the API allows at most 1000 personalizations
+SENDGRID_BATCH_SIZE = 1000
 
-def send_verification_email(email: str, name: str, token: str) -> bool:
-    """Send verification email using SendGrid"""
-    try:
-        sg = SendGridAPIClient(api_key=os.getenv("SENDGRID_API_KEY"))
-        
-        # Email template
-        subject = "DreateAI Discord Invitation"
-        html_content = f"""
+# Email template
+EMAIL_SUBJECT = "DreateAI Discord Invitation"
+EMAIL_TEMPLATE = """
         <html>
         <body>
             <h2>Welcome {name}!</h2>
             <p>We're excited to finally give you access to our exclusive Discord community. Please use the following verification code to complete your registration:</p>
             <p>Invitation link to the Discord server: <a href="https://discord.gg/zCq5UEfqNm">https://discord.gg/zCq5UEfqNm</a></p>
             <h1 style="color: #007bff; font-size: 2em; text-align: center; padding: 20px; background: #f8f9fa; border-radius: 5px;">{token}</h1>
-            <p>This code will expire in {os.getenv('TOKEN_EXPIRY_DAYS', 7)} days.</p>
+            <p>This code will expire in {days} days.</p>
             <p>If you didn't request this, please ignore this email.</p>
             <br>
             <p>Best regards,<br>Team Dreate</p>
         </body>
         </html>
         """
-        
+
+# Same body with SendGrid substitution tags, filled in per recipient by the bulk send
+BULK_EMAIL_HTML = EMAIL_TEMPLATE.format(name="-name-", token="-token-", days=TOKEN_EXPIRY_DAYS)
+
+# Created lazily by get_sendgrid_client and reused for every send
+_sendgrid_client: Optional[SendGridAPIClient] = None
+
+_TOKEN_ALPHABET = string.ascii_uppercase + string.digits
+
+# Random bytes are mapped onto the alphabet with bytes.translate; bytes at or above the
+# largest multiple of the alphabet size are dropped so every character stays equally likely
+_TOKEN_BYTE_LIMIT = 256 - 256 % len(_TOKEN_ALPHABET)
+_TOKEN_BYTE_TABLE = bytes(ord(_TOKEN_ALPHABET[b % len(_TOKEN_ALPHABET)]) for b in range(256))
+_TOKEN_REJECTED_BYTES = bytes(range(_TOKEN_BYTE_LIMIT, 256))
+
+def generate_token(length: int = 6) -> str:
+    """Generate a cryptographically random alphanumeric token of specified length"""
+    return ''.join(secrets.choice(_TOKEN_ALPHABET) for _ in range(length))
+
+def generate_tokens(count: int, length: int = 6) -> List[str]:
+    """Generate `count` cryptographically random tokens from a single pass over random bytes"""
+    needed = count * length
+    chars = b""
+    while len(chars) < needed:
+        # Over-draw slightly so the rejected bytes rarely force another round
+        raw = secrets.token_bytes(needed - len(chars) + 16)
+        chars += raw.translate(_TOKEN_BYTE_TABLE, _TOKEN_REJECTED_BYTES)
+    text = chars[:needed].decode("ascii")
+    return [text[i:i + length] for i in range(0, needed, length)]
+
+def is_token_expired(token_created_at: datetime, expiry_days: Optional[int] = None) -> bool:
+    """Check if a token has expired based on creation date"""
+    expiry = TOKEN_EXPIRY if expiry_days is None else timedelta(days=expiry_days)
+    return datetime.now(timezone.utc) - token_created_at > expiry
+
+def get_sendgrid_client() -> SendGridAPIClient:
+    """Return the shared SendGrid client, creating it on first use"""
+    global _sendgrid_client
+    if _sendgrid_client is None:
+        _sendgrid_client = SendGridAPIClient(api_key=os.getenv("SENDGRID_API_KEY"))
+    return _sendgrid_client
+
+def send_verification_email(email: str, name: str, token: str) -> bool:
+    """Send verification email using SendGrid"""
+    try:
         message = Mail(
-            from_email=(os.getenv("SENDGRID_FROM_EMAIL"), "Team Dreate"),
+            from_email=(SENDGRID_FROM_EMAIL, "Team Dreate"),
             to_emails=email,
-            subject=subject,
-            html_content=html_content
+            subject=EMAIL_SUBJECT,
+            html_content=EMAIL_TEMPLATE.format(name=name, token=token, days=TOKEN_EXPIRY_DAYS)
         )
         
-        response = sg.send(message)
+        response = get_sendgrid_client().send(message)
         return response.status_code == 202
         
     except Exception as e:
         print(f"Error sending email: {e}")
         return False
 
+def send_verification_emails_bulk(recipients: List[Tuple[str, str, str]]) -> Optional[int]:
+    """Send up to SENDGRID_BATCH_SIZE (email, name, token) recipients in one request; returns the status code, or None without a response"""
+    try:
+        message = Mail(
+            from_email=(SENDGRID_FROM_EMAIL, "Team Dreate"),
+            to_emails=[
+                To(email, substitutions={"-name-": name, "-token-": token})
+                for email, name, token in recipients
+            ],
+            subject=EMAIL_SUBJECT,
+            html_content=BULK_EMAIL_HTML,
+            is_multiple=True
+        )
+        
+        response = get_sendgrid_client().send(message)
+        return response.status_code
+        
+    except HTTPError as e:
+        print(f"Error sending bulk email: {e.status_code} {e.body}")
+        return e.status_code
+    except Exception as e:
+        print(f"Error sending bulk email: {e}")
+        return None
+
 def mask_token(token: str) -> str:
     """Mask a token for display purposes (show only first and last character)"""
     if len(token) <= 2: